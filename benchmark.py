@@ -0,0 +1,130 @@
+import argparse, json, platform, random, sys, timeit
+from functions import Automaton, TuringMachine_BalanceParantheses, TuringMachine_BinaryIncrement
+from misc import check_equivalence, simulate_word, simulate_words
+
+# Seeded generators
+
+def random_nfa(num_states, alphabet_size=2, density=0.2, final_ratio=0.3, seed=0):
+    # Each (state, symbol, target) transition is present with probability density
+    rng = random.Random(seed)
+    states = [f"q{index}" for index in range(num_states)]
+    alphabet = [chr(ord("a") + index) for index in range(alphabet_size)]
+    transitions = {state: {symbol: [target for target in states if rng.random() < density] for symbol in alphabet} for state in states}
+    final_states = [state for state in states if rng.random() < final_ratio]
+    return Automaton(states, alphabet, transitions, states[0], final_states, False)
+
+def random_dfa(num_states, alphabet_size=2, completeness=1.0, final_ratio=0.5, seed=0):
+    # Each (state, symbol) has a transition to a uniformly random state with probability completeness
+    rng = random.Random(seed)
+    states = [str(index) for index in range(num_states)]
+    alphabet = [chr(ord("a") + index) for index in range(alphabet_size)]
+    transitions = {state: {symbol: rng.choice(states) for symbol in alphabet if rng.random() < completeness} for state in states}
+    final_states = [state for state in states if rng.random() < final_ratio]
+    return Automaton(states, alphabet, transitions, states[0], final_states, True)
+
+def nth_from_end_nfa(n):
+    # Words over {a, b} whose n-th symbol from the end is 'a'; the minimal DFA has 2^n states
+    states = [f"q{index}" for index in range(n + 1)]
+    transitions = {"q0": {"a": ["q0", "q1"], "b": ["q0"]}}
+    for index in range(1, n):
+        transitions[f"q{index}"] = {"a": [f"q{index + 1}"], "b": [f"q{index + 1}"]}
+    transitions[f"q{n}"] = {}
+    return Automaton(states, ["a", "b"], transitions, "q0", [f"q{n}"], False)
+
+def random_words(alphabet, count, length, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+# Timing
+
+def best_time(function, repeat=3):
+    # Each sample loops the function until it has run for at least 0.2 s; the fastest per-call time is kept
+    timer = timeit.Timer(function)
+    best = float("inf")
+    for _ in range(repeat):
+        loops, seconds = timer.autorange()
+        best = min(best, seconds / loops)
+    return best
+
+def run_benchmarks(sizes=(1000, 10000, 30000), nth_sizes=(8, 12, 14), nfa_cases=((50, 0.025, 2), (60, 0.02, 1)), tape_sizes=(1000, 10000), repeat=3):
+    results = {}
+
+    for n in nth_sizes:
+        nfa = nth_from_end_nfa(n)
+        results[f"convert_to_dfa/nth_from_end/{n}"] = best_time(nfa.convert_to_dfa, repeat)
+
+    # (states, density, seed) picked so the subset construction blows up to thousands of DFA states
+    for num_states, density, seed in nfa_cases:
+        nfa = random_nfa(num_states, density=density, seed=seed)
+        results[f"convert_to_dfa/random_nfa/{num_states}/{density}"] = best_time(nfa.convert_to_dfa, repeat)
+
+    for size in sizes:
+        dfa = random_dfa(size, seed=size)
+        minimized = dfa.minimize_dfa()
+        results[f"minimize_dfa/hopcroft/{size}"] = best_time(lambda: dfa.minimize_dfa(), repeat)
+        results[f"minimize_dfa/moore/{size}"] = best_time(lambda: dfa.minimize_dfa(method="moore"), repeat)
+        results[f"check_equivalence/random_dfa/{size}"] = best_time(lambda: check_equivalence(dfa, minimized), repeat)
+
+        words = random_words(dfa.alphabet, 1000, 50, seed=size)
+        results[f"simulate_word/random_dfa/{size}"] = best_time(lambda: [simulate_word(dfa, word) for word in words], repeat)
+        results[f"simulate_words/random_dfa/{size}"] = best_time(lambda: simulate_words(dfa, words), repeat)
+
+    nfa = nth_from_end_nfa(10)
+    words = random_words(nfa.alphabet, 1000, 50)
+    results["simulate_word/nth_from_end/10"] = best_time(lambda: [simulate_word(nfa, word) for word in words], repeat)
+    results["simulate_words/nth_from_end/10"] = best_time(lambda: simulate_words(nfa, words), repeat)
+
+    for size in tape_sizes:
+        results[f"turing_machine/binary_increment/{size}"] = best_time(lambda: TuringMachine_BinaryIncrement("1" * size).run(), repeat)
+        results[f"turing_machine/balance_parentheses/{size}"] = best_time(lambda: TuringMachine_BalanceParantheses("(" * (size // 2) + ")" * (size // 2)).run(), repeat)
+
+    return results
+
+def compare(results, baseline, tolerance, floor=0.005):
+    # Returns the benchmarks that are more than tolerance times slower than the baseline and also
+    # at least floor seconds slower, so noise on sub-millisecond cases cannot fail the run
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is not None and seconds > previous * tolerance and seconds - previous > floor:
+            regressions.append((name, previous, seconds))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the automaton and Turing machine hot paths.")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="where to write the results (JSON)")
+    parser.add_argument("-b", "--baseline", help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to the --baseline path")
+    parser.add_argument("-t", "--tolerance", type=float, default=1.5, help="fail when a benchmark is this many times slower than the baseline")
+    parser.add_argument("-f", "--floor", type=float, default=5.0, help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timed samples per benchmark (the best one is kept)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        results = run_benchmarks(sizes=(10000,), nth_sizes=(8, 12), nfa_cases=((50, 0.025, 2),), tape_sizes=(1000,), repeat=args.repeat)
+    else:
+        results = run_benchmarks(repeat=args.repeat)
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    for name, seconds in sorted(results.items()):
+        print(f"{name:45} {seconds * 1000:10.2f} ms")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"Baseline saved as {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.floor / 1000)
+        for name, previous, seconds in regressions:
+            print(f"REGRESSION {name}: {previous * 1000:.2f} ms -> {seconds * 1000:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
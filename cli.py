@@ -0,0 +1,94 @@
+import argparse, json, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from misc import AutomatonCache, automaton_from_dict, automaton_to_dict, load_automata, simulate_words
+
+OPERATIONS = ("convert", "minimize", "simulate", "equivalence")
+
+# Set once per worker process so the word list is not pickled with every task
+_words = []
+_cache = AutomatonCache()
+
+def _init_worker(words, cache_dir=None):
+    global _words, _cache
+    _words = words
+    _cache = AutomatonCache(directory=cache_dir)
+
+def process_automaton(task):
+    source, index, data, operations, max_states = task
+    result = {"source": source, "index": index}
+    try:
+        automaton = automaton_from_dict(data)
+        result["states"] = len(automaton.states)
+        dfa = automaton
+
+        if "convert" in operations and not automaton.is_dfa:
+            dfa = _cache.converted(automaton, max_states)
+            result["dfa_states"] = len(dfa.states)
+
+        if "minimize" in operations:
+            dfa = _cache.minimized(automaton, max_states)
+            result["minimized_states"] = len(dfa.states)
+            result["language_hash"] = dfa.structural_hash()
+
+        if "simulate" in operations:
+            result["accepted"] = simulate_words(dfa, _words)
+
+        if "equivalence" in operations:
+            # Without a converted or minimized result to check, compare against the minimal DFA
+            other = dfa if dfa is not automaton else _cache.minimized(automaton, max_states)
+            word = automaton.find_distinguishing_word(other)
+            result["equivalent"] = word is None
+            if word is not None:
+                result["distinguishing_word"] = word
+
+        if "minimize" in operations or "convert" in operations:
+            result["result"] = automaton_to_dict(dfa)
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+def read_words(path):
+    with open(path) as file:
+        return [line.rstrip("\n") for line in file]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert, minimize and simulate automata without the GUI.")
+    parser.add_argument("automata", nargs="+", help="JSON automaton files (.jsonl for one automaton per line)")
+    parser.add_argument("-w", "--words", help="word list, one word per line")
+    parser.add_argument("-o", "--output", help="JSON lines output file (default: stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: number of cores)")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help=f"comma-separated subset of {','.join(OPERATIONS)}")
+    parser.add_argument("--max-states", type=int, help="abort conversion of an automaton past this many DFA states")
+    parser.add_argument("--cache-dir", help="directory where converted and minimized DFAs are cached between runs")
+    args = parser.parse_args(argv)
+
+    operations = set(args.operations.split(","))
+    unknown = operations - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    if "simulate" in operations and not args.words:
+        operations.discard("simulate")
+    words = read_words(args.words) if args.words else []
+
+    tasks = []
+    for path in args.automata:
+        for index, automaton in enumerate(load_automata(path)):
+            tasks.append((path, index, automaton_to_dict(automaton), operations, args.max_states))
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.jobs <= 1:
+            _init_worker(words, args.cache_dir)
+            for result in map(process_automaton, tasks):
+                output.write(json.dumps(result) + "\n")
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(words, args.cache_dir)) as executor:
+                chunksize = max(1, len(tasks) // (args.jobs * 4))
+                for result in executor.map(process_automaton, tasks, chunksize=chunksize):
+                    output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
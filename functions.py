@@ -1,3 +1,110 @@
+import hashlib, json, mmap, os, time
+from array import array
+from collections import OrderedDict, deque
+from profiling import phase
+
+def _single_target(target):
+    # DFA transitions may be stored as a state name or as a one-element list
+    if target is None or isinstance(target, str):
+        return target
+    for state in target:
+        return state
+    return None
+
+def _all_targets(target):
+    # NFA transitions are lists of states; DFA transitions may be a single state name
+    if target is None:
+        return ()
+    if isinstance(target, str):
+        return (target,)
+    return target
+
+def _mask_successors(mask, successors, num_symbols):
+    # Union of the per-symbol successor masks of every state in the subset
+    next_masks = [0] * num_symbols
+    while mask:
+        low_bit = mask & -mask
+        row = successors[low_bit.bit_length() - 1]
+        for symbol in range(num_symbols):
+            next_masks[symbol] |= row[symbol]
+        mask ^= low_bit
+    return next_masks
+
+class StateLimitError(ValueError):
+    pass
+
+def _discover(initial, expand, dead=None, max_states=None, construction="Construction", profiler=None, operation=None):
+    # Breadth-first discovery shared by the subset and product constructions. expand(state) gives the
+    # next state per symbol; next states equal to dead are left out (None). States get ids in discovery
+    # order, so initial is 0. Returns (states, targets) with targets[id][symbol] -> id or None.
+    ids = {initial: 0}
+    states = [initial]
+    targets = []
+    queue = deque(states)
+    while queue:
+        if profiler is not None:
+            profiler.peak(operation, "worklist_peak", len(queue))
+            if len(targets) % profiler.progress_interval == 0:
+                profiler.progress(operation, states_discovered=len(states), processed=len(targets), worklist=len(queue))
+        row = []
+        for next_state in expand(queue.popleft()):
+            if next_state == dead:
+                row.append(None)
+                continue
+            next_id = ids.get(next_state)
+            if next_id is None:
+                next_id = len(states)
+                if max_states is not None and next_id >= max_states:
+                    raise StateLimitError(f"{construction} exceeded {max_states} states.")
+                ids[next_state] = next_id
+                states.append(next_state)
+                queue.append(next_state)
+            row.append(next_id)
+        targets.append(row)
+    if profiler is not None:
+        profiler.count(operation, "states_discovered", len(states))
+    return states, targets
+
+def _named_transitions(alphabet, targets):
+    # Transition dict of a discovered DFA with states named by id; None targets are left out
+    return {str(state): {symbol: str(target) for symbol, target in zip(alphabet, row) if target is not None} for state, row in enumerate(targets)}
+
+def _vector_times_matrix(vector, matrix, modulus):
+    result = {}
+    for state, count in vector.items():
+        for next_state, ways in matrix[state].items():
+            result[next_state] = result.get(next_state, 0) + count * ways
+    if modulus is not None:
+        result = {state: count % modulus for state, count in result.items() if count % modulus}
+    return result
+
+def _matrix_times_matrix(left, right, modulus):
+    return [_vector_times_matrix(row, right, modulus) for row in left]
+
+def _words_of_length(initial, successors, alive_by_remaining, length):
+    # Depth-first in symbol order, entering only states from which the remaining suffix can still be accepted
+    if initial not in alive_by_remaining[length]:
+        return
+    if length == 0:
+        yield ""
+        return
+    word = []
+    stack = [iter(successors[initial])]
+    while stack:
+        remaining = length - len(word) - 1
+        for symbol, next_state in stack[-1]:
+            if next_state in alive_by_remaining[remaining]:
+                if remaining == 0:
+                    yield "".join(word) + symbol
+                    continue
+                word.append(symbol)
+                stack.append(iter(successors[next_state]))
+                break
+        else:
+            stack.pop()
+            if word:
+                word.pop()
+
 class Automaton:
     def __init__(self, states, alphabet, transitions, initial_state, final_states, is_dfa):
         self.states = states
@@ -10,157 +117,1191 @@ class Automaton:
     def get_next_states(self, state, symbol):
         next_states = set()
         if state in self.transitions and symbol in self.transitions[state]:
-            next_states.update(self.transitions[state][symbol])
+            target = self.transitions[state][symbol]
+            if isinstance(target, str):
+                next_states.add(target)                 # DFA transitions map to a single state name
+            else:
+                next_states.update(target)
         return next_states
-    
-    def convert_to_dfa(self):
-        dfa_states = []
-        dfa_transitions = {}
-        initial_state = frozenset([self.initial_state])
-        final_states = set()
 
-        # Queue for processing states
-        queue = [initial_state]
-        dfa_states.append(initial_state)
+    def compile(self):
+        if not self.is_dfa:
+            raise ValueError("Compilation can only be applied to DFA.")
+        return CompiledDFA(self)
+
+    def structural_hash(self):
+        # SHA-256 of the automaton's structure, independent of the order of states, symbols and targets
+        transitions = {}
+        for state in self.states:
+            transitions[state] = {}
+            for symbol in self.alphabet:
+                next_states = self.get_next_states(state, symbol)
+                if next_states:
+                    transitions[state][symbol] = sorted(next_states)
+        data = {
+            "states": sorted(self.states),
+            "alphabet": sorted(self.alphabet),
+            "transitions": transitions,
+            "initial_state": self.initial_state,
+            "final_states": sorted(set(self.final_states)),
+            "is_dfa": self.is_dfa,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def canonical_form(self):
+        # Renumbers a DFA's reachable states in breadth-first order, following symbols in sorted order.
+        # Minimized DFAs of the same language (over the same alphabet) get identical canonical forms.
+        if not self.is_dfa:
+            raise ValueError("Canonical form can only be computed for DFA.")
+        alphabet = sorted(self.alphabet)
+        names = {self.initial_state: "0"}
+        order = [self.initial_state]
+        queue = deque(order)
+        transitions = {}
 
         while queue:
-            current_state = queue.pop(0)
-            dfa_transitions[current_state] = {}
+            state = queue.popleft()
+            trans = self.transitions.get(state, {})
+            row = {}
+            for symbol in alphabet:
+                next_state = _single_target(trans.get(symbol))
+                if next_state is None:
+                    continue
+                if next_state not in names:
+                    names[next_state] = str(len(order))
+                    order.append(next_state)
+                    queue.append(next_state)
+                row[symbol] = names[next_state]
+            transitions[names[state]] = row
 
-            for symbol in self.alphabet:
-                next_states = set()
+        final_states = set(self.final_states)
+        return Automaton(
+            states=[names[state] for state in order],
+            alphabet=alphabet,
+            transitions=transitions,
+            initial_state="0",
+            final_states=[names[state] for state in order if state in final_states],
+            is_dfa=True
+        )
 
-                for state in current_state:
-                    next_states.update(self.get_next_states(state, symbol))
+    def canonical_hash(self):
+        # Language fingerprint: equal for two automata exactly when their minimal DFAs over the same alphabet coincide
+        dfa = self if self.is_dfa else self.convert_to_dfa()
+        return dfa.minimize_dfa().canonical_form().structural_hash()
 
-                if next_states:
-                    next_state = frozenset(next_states)
+    def lazy_dfa(self, cache_size=10000):
+        return LazyDFA(self, cache_size)
+
+    def stream_matcher(self, report_offsets=False, encoding="latin-1", max_states=None):
+        return StreamMatcher(self, report_offsets, encoding, max_states)
+    
+    def _bitset_tables(self):
+        # NFA states get bit positions; successors[state_bit][symbol_index] is the mask of next states
+        state_ids = {}
+        for state in self.states:
+            state_ids.setdefault(state, len(state_ids))
+        state_ids.setdefault(self.initial_state, len(state_ids))
+        for trans in self.transitions.values():
+            for target in trans.values():
+                for state in _all_targets(target):
+                    state_ids.setdefault(state, len(state_ids))
 
-                    if next_state not in dfa_states:
-                        dfa_states.append(next_state)
-                        queue.append(next_state)
+        symbol_ids = {symbol: index for index, symbol in enumerate(self.alphabet)}
+        successors = [[0] * len(self.alphabet) for _ in range(len(state_ids))]
+        for state, trans in self.transitions.items():
+            if state not in state_ids:
+                continue
+            row = successors[state_ids[state]]
+            for symbol, target in trans.items():
+                if symbol not in symbol_ids:
+                    continue
+                mask = 0
+                for next_state in _all_targets(target):
+                    mask |= 1 << state_ids[next_state]
+                row[symbol_ids[symbol]] |= mask
 
-                    dfa_transitions[current_state][symbol] = next_state
+        final_mask = 0
+        for state in self.final_states:
+            if state in state_ids:
+                final_mask |= 1 << state_ids[state]
+        return state_ids, successors, final_mask
 
-            # Check for final states
-            if current_state & set(self.final_states):
-                final_states.add(current_state)
+    def convert_to_dfa(self, max_states=None, profiler=None):
+        # Subset construction over integer bitmasks; max_states aborts with StateLimitError
+        # when the DFA grows past the given number of states
+        with phase(profiler, "convert_to_dfa", "tables"):
+            state_ids, successors, final_mask = self._bitset_tables()
+        num_symbols = len(self.alphabet)
+        initial_mask = 1 << state_ids[self.initial_state]
 
-        # Convert state sets to strings
-        state_map = {state: str(index) for index, state in enumerate(dfa_states)}
-        transitions_named = {state_map[state]: {symbol: state_map[next_state] for symbol, next_state in trans.items()} for state, trans in dfa_transitions.items()}
-        initial_state_named = state_map[initial_state]
-        final_states_named = {state_map[state] for state in final_states}
+        with phase(profiler, "convert_to_dfa", "subsets"):
+            dfa_masks, dfa_targets = _discover(initial_mask, lambda mask: _mask_successors(mask, successors, num_symbols), 0, max_states, "Subset construction", profiler, "convert_to_dfa")
+
+        # Name DFA states by discovery order
+        with phase(profiler, "convert_to_dfa", "naming"):
+            transitions_named = _named_transitions(self.alphabet, dfa_targets)
+            final_states_named = [str(index) for index, mask in enumerate(dfa_masks) if mask & final_mask]
 
         return Automaton(
-            states=list(state_map.values()),
+            states=list(transitions_named),
             alphabet=self.alphabet,
             transitions=transitions_named,
-            initial_state=initial_state_named,
-            final_states=list(final_states_named),
+            initial_state="0",
+            final_states=final_states_named,
             is_dfa=True
         )
 
-    
-    def minimize_dfa(self):
-        if not self.is_dfa:
-            raise ValueError("Minimization can only be applied to DFA.")
+    def _stepper(self, alphabet):
+        # Deterministic view of the automaton over the given alphabet: returns (initial, step, is_final, dead)
+        # where step(state) gives the successor for every symbol. DFAs use integer ids from the
+        # compiled table (dead is -1); NFAs use subset bitmasks (dead is 0).
+        if self.is_dfa:
+            compiled = self.compile()
+            table, width, accepting = compiled.table, compiled.width, compiled.accepting
+            columns = [compiled.symbol_ids.get(symbol) for symbol in alphabet]
+            dead = (CompiledDFA.DEAD_STATE,) * len(alphabet)
 
-        # Step 1: Remove unreachable states
+            def step(state):
+                if state < 0:
+                    return dead
+                row = state * width
+                return tuple(table[row + column] if column is not None else CompiledDFA.DEAD_STATE for column in columns)
+
+            return compiled.initial, step, lambda state: state >= 0 and accepting[state] == 1, CompiledDFA.DEAD_STATE
+
+        state_ids, successors, final_mask = self._bitset_tables()
+        symbol_ids = {symbol: index for index, symbol in enumerate(self.alphabet)}
+        columns = [symbol_ids.get(symbol) for symbol in alphabet]
+        width = len(symbol_ids)
+
+        def step(mask):
+            next_masks = _mask_successors(mask, successors, width)
+            return tuple(next_masks[column] if column is not None else 0 for column in columns)
+
+        return 1 << state_ids[self.initial_state], step, lambda mask: bool(mask & final_mask), 0
+
+    def _joint_alphabet(self, other):
+        return list(self.alphabet) + [symbol for symbol in other.alphabet if symbol not in self.alphabet]
+
+    def _search_pairs(self, other, accept, prune, profiler=None, operation="product"):
+        # Breadth-first search over the reachable pairs of both automata (determinized on the fly).
+        # Stops at the first pair whose finality satisfies accept(final1, final2) and returns a shortest
+        # word leading to it, or None. Pairs for which prune(dead1, dead2) holds are not expanded.
+        with phase(profiler, operation, "setup"):
+            alphabet = self._joint_alphabet(other)
+            initial1, step1, is_final1, dead1 = self._stepper(alphabet)
+            initial2, step2, is_final2, dead2 = other._stepper(alphabet)
+
+        start = (initial1, initial2)
+        parents = {start: None}
+        queue = deque([start])
+
+        with phase(profiler, operation, "search"):
+            while queue:
+                if profiler is not None:
+                    profiler.peak(operation, "worklist_peak", len(queue))
+                    if (len(parents) - len(queue)) % profiler.progress_interval == 0:
+                        profiler.progress(operation, pairs_discovered=len(parents), worklist=len(queue))
+                pair = queue.popleft()
+                state1, state2 = pair
+                if accept(is_final1(state1), is_final2(state2)):
+                    word = []
+                    while parents[pair] is not None:
+                        pair, symbol = parents[pair]
+                        word.append(symbol)
+                    if profiler is not None:
+                        profiler.count(operation, "pairs_discovered", len(parents))
+                    return "".join(reversed(word))
+                if prune(state1 == dead1, state2 == dead2):
+                    continue
+
+                for symbol, next_state1, next_state2 in zip(alphabet, step1(state1), step2(state2)):
+                    next_pair = (next_state1, next_state2)
+                    if next_pair not in parents:
+                        parents[next_pair] = (pair, symbol)
+                        queue.append(next_pair)
+
+        if profiler is not None:
+            profiler.count(operation, "pairs_discovered", len(parents))
+        return None
+
+    def find_distinguishing_word(self, other, profiler=None):
+        # Returns a shortest word accepted by exactly one of the automata, or None if the languages are equal
+        return self._search_pairs(other, lambda final1, final2: final1 != final2, lambda dead1, dead2: dead1 and dead2, profiler, "check_equivalence")
+
+    def inclusion_counterexample(self, other, profiler=None):
+        # Returns a shortest word accepted by this automaton but not by other, or None if L(self) is a subset of L(other)
+        return self._search_pairs(other, lambda final1, final2: final1 and not final2, lambda dead1, dead2: dead1, profiler, "check_inclusion")
+
+    def is_subset_of(self, other, profiler=None):
+        return self.inclusion_counterexample(other, profiler) is None
+
+    def intersects(self, other, profiler=None):
+        # Stops at the first reachable pair where both automata accept
+        return self._search_pairs(other, lambda final1, final2: final1 and final2, lambda dead1, dead2: dead1 or dead2, profiler, "check_intersection") is not None
+
+    def is_empty(self):
+        alphabet = list(self.alphabet)
+        initial, step, is_final, dead = self._stepper(alphabet)
+        seen = {initial}
+        queue = deque([initial])
+        while queue:
+            state = queue.popleft()
+            if is_final(state):
+                return False
+            for next_state in step(state):
+                if next_state != dead and next_state not in seen:
+                    seen.add(next_state)
+                    queue.append(next_state)
+        return True
+
+    def _product(self, other, accept, prune, max_states=None, profiler=None, operation="product"):
+        # Builds only the pairs reachable from the initial pair; states are named by discovery order
+        with phase(profiler, operation, "setup"):
+            alphabet = self._joint_alphabet(other)
+            initial1, step1, is_final1, dead1 = self._stepper(alphabet)
+            initial2, step2, is_final2, dead2 = other._stepper(alphabet)
+
+        def expand(pair):
+            # Pairs that cannot lead to an accepting pair are dropped, like missing DFA transitions
+            return [None if prune(next_state1 == dead1, next_state2 == dead2) else (next_state1, next_state2) for next_state1, next_state2 in zip(step1(pair[0]), step2(pair[1]))]
+
+        with phase(profiler, operation, "pairs"):
+            pairs, product_targets = _discover((initial1, initial2), expand, None, max_states, "Product construction", profiler, operation)
+
+        transitions_named = _named_transitions(alphabet, product_targets)
+        return Automaton(
+            states=list(transitions_named),
+            alphabet=alphabet,
+            transitions=transitions_named,
+            initial_state="0",
+            final_states=[str(index) for index, (state1, state2) in enumerate(pairs) if accept(is_final1(state1), is_final2(state2))],
+            is_dfa=True
+        )
+
+    def intersection(self, other, max_states=None, profiler=None):
+        return self._product(other, lambda final1, final2: final1 and final2, lambda dead1, dead2: dead1 or dead2, max_states, profiler, "intersection")
+
+    def union(self, other, max_states=None, profiler=None):
+        return self._product(other, lambda final1, final2: final1 or final2, lambda dead1, dead2: dead1 and dead2, max_states, profiler, "union")
+
+    def difference(self, other, max_states=None, profiler=None):
+        return self._product(other, lambda final1, final2: final1 and not final2, lambda dead1, dead2: dead1, max_states, profiler, "difference")
+
+    def complement(self, max_states=None, profiler=None):
+        # Complement with respect to this automaton's alphabet. The result is a complete DFA:
+        # missing transitions go to an explicit (now accepting) dead state.
+        alphabet = list(self.alphabet)
+        initial, step, is_final, dead = self._stepper(alphabet)
+
+        with phase(profiler, "complement", "states"):
+            states, complement_targets = _discover(initial, step, None, max_states, "Complement construction", profiler, "complement")
+
+        transitions_named = _named_transitions(alphabet, complement_targets)
+        return Automaton(
+            states=list(transitions_named),
+            alphabet=alphabet,
+            transitions=transitions_named,
+            initial_state="0",
+            final_states=[str(index) for index, state in enumerate(states) if not is_final(state)],
+            is_dfa=True
+        )
+
+    def _transition_lists(self):
+        # Reachable part of the determinized automaton as integer lists: (initial, successors, accepting)
+        # where successors[state] holds (symbol, next_state) pairs in sorted symbol order
+        dfa = self if self.is_dfa else self.convert_to_dfa()
+        states = dfa._reachable_states()
+        ids = {state: index for index, state in enumerate(states)}
+        alphabet = sorted(dfa.alphabet)
+        successors = []
+        for state in states:
+            trans = dfa.transitions.get(state, {})
+            row = []
+            for symbol in alphabet:
+                next_state = _single_target(trans.get(symbol))
+                if next_state in ids:
+                    row.append((symbol, ids[next_state]))
+            successors.append(row)
+        final_states = set(dfa.final_states)
+        return 0, successors, [state in final_states for state in states]
+
+    def count_words(self, length, modulus=None, method="auto"):
+        # Number of accepted words of the given length (optionally modulo modulus). "dp" steps a count
+        # vector length times, O(length * transitions); "matrix" uses repeated squaring of the transition
+        # count matrix, O(states^3 * log(length)); "auto" picks the cheaper estimate.
+        if method not in ("auto", "dp", "matrix"):
+            raise ValueError(f"Unknown counting method: {method}")
+        if length < 0:
+            return 0
+        initial, successors, accepting = self._transition_lists()
+        num_states = len(successors)
+        if method == "auto":
+            num_transitions = sum(len(row) for row in successors)
+            method = "dp" if length * num_transitions <= num_states ** 3 * max(1, length.bit_length()) else "matrix"
+
+        if method == "dp":
+            counts = [0] * num_states
+            counts[initial] = 1
+            for _ in range(length):
+                next_counts = [0] * num_states
+                for state, count in enumerate(counts):
+                    if count:
+                        for _, next_state in successors[state]:
+                            next_counts[next_state] += count
+                if modulus is not None:
+                    next_counts = [count % modulus for count in next_counts]
+                counts = next_counts
+        else:
+            # Sparse rows: matrix[state] maps next_state -> number of symbols leading there
+            matrix = []
+            for row in successors:
+                entries = {}
+                for _, next_state in row:
+                    entries[next_state] = entries.get(next_state, 0) + 1
+                matrix.append(entries)
+            counts = {initial: 1}
+            power = length
+            while power:
+                if power & 1:
+                    counts = _vector_times_matrix(counts, matrix, modulus)
+                power >>= 1
+                if power:
+                    matrix = _matrix_times_matrix(matrix, matrix, modulus)
+            counts = [counts.get(state, 0) for state in range(num_states)]
+
+        total = sum(count for state, count in enumerate(counts) if accepting[state])
+        return total % modulus if modulus is not None else total
+
+    def accepted_words(self, max_length=None):
+        # Yields accepted words in shortlex order (by length, then by sorted symbol order). Only states
+        # that can still reach a final state in exactly the remaining number of steps are explored, so
+        # each word costs O(length * |alphabet|). Stops on its own once no longer words exist.
+        initial, successors, accepting = self._transition_lists()
+        predecessors = [[] for _ in successors]
+        for state, row in enumerate(successors):
+            for _, next_state in row:
+                predecessors[next_state].append(state)
+
+        # alive_by_remaining[r] holds the states with an accepted continuation of exactly r symbols
+        alive_by_remaining = [{state for state, is_final in enumerate(accepting) if is_final}]
+        length = 0
+        while max_length is None or length <= max_length:
+            alive = alive_by_remaining[length]
+            if not alive:
+                return
+            yield from _words_of_length(initial, successors, alive_by_remaining, length)
+            alive_by_remaining.append({state for target in alive for state in predecessors[target]})
+            length += 1
+
+    def _reachable_states(self):
+        # Breadth-first order from the initial state; does not modify the automaton
         reachable_states = {self.initial_state}
-        queue = [self.initial_state]
-        
+        order = [self.initial_state]
+        queue = deque(order)
+
         while queue:
-            state = queue.pop(0)
+            state = queue.popleft()
+            trans = self.transitions.get(state, {})
             for symbol in self.alphabet:
-                next_state = self.transitions.get(state, {}).get(symbol, None)
+                next_state = _single_target(trans.get(symbol))
                 if next_state is not None and next_state not in reachable_states:
                     reachable_states.add(next_state)
+                    order.append(next_state)
                     queue.append(next_state)
-        
-        self.states = list(reachable_states)
-        self.transitions = {state: trans for state, trans in self.transitions.items() if state in reachable_states}
-        self.final_states = [state for state in self.final_states if state in reachable_states]
-
-        # Step 2: Applying the Myhill-Nerode theorem
-        partition = [set(self.final_states), set(self.states) - set(self.final_states)]
-        
-        while True:
-            new_partition = []
-            for group in partition:
-                grouped_states = {}
-                for state in group:
-                    signature = tuple(sorted([(symbol, self.transitions.get(state, {}).get(symbol, None)) for symbol in self.alphabet]))
-                    if signature not in grouped_states:
-                        grouped_states[signature] = set()
-                    grouped_states[signature].add(state)
-                new_partition.extend(grouped_states.values())
-            if len(new_partition) == len(partition):
-                break
-            partition = new_partition
-        
+        return order
+
+    def minimize_dfa(self, method="hopcroft", profiler=None):
+        if not self.is_dfa:
+            raise ValueError("Minimization can only be applied to DFA.")
+        if method not in ("hopcroft", "moore"):
+            raise ValueError(f"Unknown minimization method: {method}")
+
+        # Step 1: Remove unreachable states
+        with phase(profiler, "minimize_dfa", "reachability"):
+            states = self._reachable_states()
+            final_states = set(self.final_states)
+        if profiler is not None:
+            profiler.count("minimize_dfa", "reachable_states", len(states))
+
+        # Step 2: Partition the reachable states (plus a sink for missing transitions) into equivalence classes
+        with phase(profiler, "minimize_dfa", "indexing"):
+            ids = {state: index for index, state in enumerate(states)}
+            sink = len(states)
+            targets = []
+            for state in states:
+                trans = self.transitions.get(state, {})
+                targets.append([ids.get(_single_target(trans.get(symbol)), sink) for symbol in self.alphabet])
+            targets.append([sink] * len(self.alphabet))
+            accepting = [state in final_states for state in states] + [False]
+
+        with phase(profiler, "minimize_dfa", "refinement"):
+            if method == "hopcroft":
+                block_of = _hopcroft_partition(targets, accepting, profiler)
+            else:
+                block_of = _moore_partition(targets, accepting, profiler)
+
+        # Order classes by first appearance in BFS order and drop the sink's class,
+        # unless the initial state itself is dead (empty language)
+        partition = []
+        block_class = {}
+        for index, state in enumerate(states):
+            block = block_of[index]
+            if block == block_of[sink] and index != 0:
+                continue
+            if block not in block_class:
+                block_class[block] = len(partition)
+                partition.append([])
+            partition[block_class[block]].append(state)
+
+        if profiler is not None:
+            profiler.count("minimize_dfa", "classes", len(partition))
+
         # Step 3: Create the new minimized DFA
-        state_map = {state: idx for idx, group in enumerate(partition) for state in group}
-        minimized_states = [str(idx) for idx in range(len(partition))]
-        minimized_transitions = {str(idx): {} for idx in range(len(partition))}
-        minimized_final_states = {str(state_map[state]) for state in self.final_states}
-        minimized_initial_state = str(state_map[self.initial_state])
-        
-        for group in partition:
-            representative = next(iter(group))
-            for symbol in self.alphabet:
-                next_state = self.transitions.get(representative, {}).get(symbol, None)
-                if next_state is not None:
-                    minimized_transitions[str(state_map[representative])][symbol] = str(state_map[next_state])
+        with phase(profiler, "minimize_dfa", "build"):
+            state_map = {state: idx for idx, group in enumerate(partition) for state in group}
+            minimized_states = [str(idx) for idx in range(len(partition))]
+            minimized_transitions = {str(idx): {} for idx in range(len(partition))}
+            minimized_final_states = [str(idx) for idx, group in enumerate(partition) if group[0] in final_states]
+            minimized_initial_state = str(state_map[self.initial_state])
+
+            for idx, group in enumerate(partition):
+                representative = group[0]
+                for symbol in self.alphabet:
+                    next_state = _single_target(self.transitions.get(representative, {}).get(symbol))
+                    if next_state is not None and next_state in state_map and block_of[ids[next_state]] != block_of[sink]:
+                        minimized_transitions[str(idx)][symbol] = str(state_map[next_state])
 
         return Automaton(
             states=minimized_states,
             alphabet=self.alphabet,
             transitions=minimized_transitions,
             initial_state=minimized_initial_state,
-            final_states=list(minimized_final_states),
+            final_states=minimized_final_states,
             is_dfa=True
         )
 
-class TuringMachine_BinaryIncrement:
-    def __init__(self, tape, blank_symbol="B"):
-        self.tape = list(tape) + [blank_symbol]
-        self.blank_symbol = blank_symbol
-        self.head_position = len(tape) - 1          # Start at the last position of the tape
-        self.current_state = "q0"  
-        self.transitions = self._define_transitions()
+def _initial_blocks(labels):
+    # Groups states by label (acceptance, or the set of pattern tags for tagged DFAs)
+    label_ids = {}
+    return [label_ids.setdefault(label, len(label_ids)) for label in labels]
+
+def _moore_partition(targets, labels, profiler=None):
+    # Round-based refinement (Myhill-Nerode): split every class by the classes of its successors until stable.
+    # targets[state][symbol] -> state, labels[state] is the initial class; returns the class id of every state
+    block_of = _initial_blocks(labels)
+    num_blocks = len(set(block_of))
+
+    while True:
+        if profiler is not None:
+            profiler.count("minimize_dfa", "refinement_rounds")
+            profiler.progress("minimize_dfa", blocks=num_blocks)
+        signatures = {}
+        new_block_of = []
+        for state, row in enumerate(targets):
+            signature = (block_of[state],) + tuple(block_of[target] for target in row)
+            new_block_of.append(signatures.setdefault(signature, len(signatures)))
+        block_of = new_block_of
+        if len(signatures) == num_blocks:
+            return block_of
+        num_blocks = len(signatures)
+
+def _hopcroft_partition(targets, labels, profiler=None):
+    # Hopcroft's O(n log n) refinement with a worklist of splitter blocks and inverse-transition indexes.
+    # targets[state][symbol] -> state must be total, labels[state] is the initial class;
+    # returns the class id of every state
+    num_states = len(targets)
+    num_symbols = len(targets[0]) if targets else 0
+
+    # Inverse transitions: inverse[symbol][target] -> sources
+    inverse = [[[] for _ in range(num_states)] for _ in range(num_symbols)]
+    for source, row in enumerate(targets):
+        for symbol, target in enumerate(row):
+            inverse[symbol][target].append(source)
+
+    block_of = _initial_blocks(labels)
+    blocks = [set() for _ in range(len(set(block_of)))]
+    for state, block_index in enumerate(block_of):
+        blocks[block_index].add(state)
+
+    worklist = deque(range(len(blocks)))
+    in_worklist = [True] * len(blocks)
+
+    rounds = 0
 
-    def _define_transitions(self):
+    while worklist:
+        if profiler is not None:
+            profiler.count("minimize_dfa", "refinement_rounds")
+            profiler.peak("minimize_dfa", "worklist_peak", len(worklist))
+            if rounds % profiler.progress_interval == 0:
+                profiler.progress("minimize_dfa", blocks=len(blocks), worklist=len(worklist))
+            rounds += 1
+        splitter_index = worklist.popleft()
+        in_worklist[splitter_index] = False
+        splitter = list(blocks[splitter_index])
+
+        for symbol in range(num_symbols):
+            # Group the predecessors of the splitter by the block they currently belong to
+            hits = {}
+            column = inverse[symbol]
+            for target in splitter:
+                for source in column[target]:
+                    hits.setdefault(block_of[source], set()).add(source)
+
+            for block_index, hit in hits.items():
+                block = blocks[block_index]
+                if len(hit) == len(block):
+                    continue
+                block -= hit
+                new_index = len(blocks)
+                blocks.append(hit)
+                in_worklist.append(False)
+                for state in hit:
+                    block_of[state] = new_index
+
+                if in_worklist[block_index]:
+                    worklist.append(new_index)
+                    in_worklist[new_index] = True
+                else:
+                    smaller = new_index if len(hit) <= len(block) else block_index
+                    worklist.append(smaller)
+                    in_worklist[smaller] = True
+
+    return block_of
+
+class NumberedStates:
+    # Read-only sequence of the state names "0".."n-1", used instead of a list for large DFAs
+    def __init__(self, count):
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("state index out of range")
+        return str(index)
+
+    def __iter__(self):
+        return map(str, range(self.count))
+
+class CompiledDFA:
+    DEAD_STATE = -1
+
+    def __init__(self, automaton):
+        # Dense integer ids for states and symbols
+        state_ids = {state: index for index, state in enumerate(automaton.states)}
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(automaton.alphabet)}
+        self.state_names = list(automaton.states)
+        self.num_states = len(self.state_names)
+        self.width = len(automaton.alphabet)
+
+        # Flat row-major table: table[state * width + symbol] -> next state or DEAD_STATE
+        self.table = array('i', [self.DEAD_STATE]) * (self.num_states * self.width)
+        for state, trans in automaton.transitions.items():
+            if state not in state_ids:
+                continue
+            row = state_ids[state] * self.width
+            for symbol, target in trans.items():
+                if symbol not in self.symbol_ids:
+                    continue
+                if not isinstance(target, str) and len(target) > 1:
+                    raise ValueError(f"State {state} has more than one transition on {symbol}.")
+                target = _single_target(target)
+                if target in state_ids:
+                    self.table[row + self.symbol_ids[symbol]] = state_ids[target]
+
+        final_states = set(automaton.final_states)
+        self.accepting = bytearray(1 if state in final_states else 0 for state in self.state_names)
+        self.initial = state_ids.get(automaton.initial_state, self.DEAD_STATE)
+
+    @classmethod
+    def from_arrays(cls, state_names, alphabet, table, accepting, initial):
+        # Wraps existing arrays (e.g. memoryviews over a memory-mapped file) without copying them
+        compiled = cls.__new__(cls)
+        compiled.symbol_ids = {symbol: index for index, symbol in enumerate(alphabet)}
+        compiled.state_names = state_names
+        compiled.num_states = len(state_names)
+        compiled.width = len(alphabet)
+        compiled.table = table
+        compiled.accepting = accepting
+        compiled.initial = initial
+        return compiled
+
+    def to_automaton(self):
+        names = list(self.state_names)
+        alphabet = list(self.symbol_ids)
+        transitions = {}
+        for state, name in enumerate(names):
+            row = state * self.width
+            transitions[name] = {symbol: names[self.table[row + column]] for column, symbol in enumerate(alphabet) if self.table[row + column] >= 0}
+        return Automaton(
+            states=names,
+            alphabet=alphabet,
+            transitions=transitions,
+            initial_state=names[self.initial] if self.initial >= 0 else None,
+            final_states=[name for state, name in enumerate(names) if self.accepting[state]],
+            is_dfa=True
+        )
+
+    def run(self, word):
+        # Returns the id of the state reached after reading the word, or DEAD_STATE
+        state, table, width, symbol_ids = self.initial, self.table, self.width, self.symbol_ids
+        for symbol in word:
+            if state < 0:
+                break
+            index = symbol_ids.get(symbol)
+            if index is None:
+                return self.DEAD_STATE
+            state = table[state * width + index]
+        return state
+
+    def accepts(self, word):
+        state = self.run(word)
+        return state >= 0 and self.accepting[state] == 1
+
+    def accepts_many(self, words):
+        # Bind everything once so the inner loop only does integer indexing
+        initial, table, width, symbol_ids, accepting = self.initial, self.table, self.width, self.symbol_ids, self.accepting
+        results = []
+        append = results.append
+        for word in words:
+            state = initial
+            for symbol in word:
+                if state < 0:
+                    break
+                index = symbol_ids.get(symbol)
+                if index is None:
+                    state = -1
+                    break
+                state = table[state * width + index]
+            append(state >= 0 and accepting[state] == 1)
+        return results
+
+class LazyDFA:
+    # On-the-fly subset construction: DFA states are created only when input reaches them and
+    # (subset, symbol) -> subset transitions are memoized in an LRU cache of cache_size entries
+
+    def __init__(self, automaton, cache_size=10000):
+        if cache_size < 1:
+            raise ValueError("Cache size must be at least 1.")
+        state_ids, self.successors, self.final_mask = automaton._bitset_tables()
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(automaton.alphabet)}
+        self.initial_mask = 1 << state_ids[automaton.initial_state]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def step(self, mask, symbol):
+        symbol_index = self.symbol_ids.get(symbol)
+        if symbol_index is None:
+            return 0
+        key = (mask, symbol_index)
+        next_mask = self.cache.get(key)
+        if next_mask is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return next_mask
+
+        self.misses += 1
+        next_mask = 0
+        while mask:
+            low_bit = mask & -mask
+            next_mask |= self.successors[low_bit.bit_length() - 1][symbol_index]
+            mask ^= low_bit
+        self.cache[key] = next_mask
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return next_mask
+
+    def accepts(self, word):
+        mask = self.initial_mask
+        for symbol in word:
+            mask = self.step(mask, symbol)
+            if not mask:
+                return False
+        return bool(mask & self.final_mask)
+
+    def accepts_many(self, words):
+        return [self.accepts(word) for word in words]
+
+    def stats(self):
+        lookups = self.hits + self.misses
         return {
-            ("q0", "1"): ("q0", "0", "L"),          # Replace '1' with '0' and go to the left
-            ("q0", "0"): ("q1", "1", "R"),          # Replace '0' with '1' and go to the final state
-            ("q0", "B"): ("q1", "1", "R"),          # If you reach the beginning of the tape, add '1'
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "cached": len(self.cache),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
         }
 
+    def clear_cache(self):
+        self.cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+class StreamMatcher:
+    # Incremental matcher over byte chunks (files, sockets, mmap regions). Every symbol of the
+    # alphabet must encode to a single byte; bytes outside the alphabet send the matcher to the dead state.
+
+    def __init__(self, automaton, report_offsets=False, encoding="latin-1", max_states=None):
+        dfa = automaton if automaton.is_dfa else automaton.convert_to_dfa(max_states=max_states)
+        compiled = dfa.compile()
+        self.encoding = encoding
+        self.report_offsets = report_offsets
+
+        # Bytes are translated to column ids with bytes.translate; the extra last column is always dead
+        self.width = compiled.width + 1
+        if self.width > 256:
+            raise ValueError("Stream matching supports at most 255 symbols.")
+        byte_map = bytearray([compiled.width]) * 256
+        for symbol, column in compiled.symbol_ids.items():
+            encoded = symbol.encode(encoding)
+            if len(encoded) != 1:
+                raise ValueError(f"Symbol {symbol!r} is not a single byte in {encoding}.")
+            byte_map[encoded[0]] = column
+        self.byte_map = bytes(byte_map)
+
+        self.table = array('i', [CompiledDFA.DEAD_STATE]) * (compiled.num_states * self.width)
+        for state in range(compiled.num_states):
+            self.table[state * self.width:state * self.width + compiled.width] = compiled.table[state * compiled.width:(state + 1) * compiled.width]
+        self.accepting = compiled.accepting
+        self.initial = compiled.initial
+        self.reset()
+
+    def reset(self):
+        self.state = self.initial
+        self.offset = 0                             # Number of bytes consumed so far
+
+    def feed(self, chunk):
+        # Consumes one chunk and returns the end offsets (in bytes from the start of the stream)
+        # at which the prefix read so far is accepted, or None when offsets are not reported
+        if isinstance(chunk, str):
+            chunk = chunk.encode(self.encoding)
+        if self.state < 0:
+            self.offset += len(chunk)
+            return [] if self.report_offsets else None
+        columns = bytes(chunk).translate(self.byte_map)
+        state, table, width, accepting = self.state, self.table, self.width, self.accepting
+        offsets = [] if self.report_offsets else None
+
+        if state >= 0:
+            if offsets is None:
+                for column in columns:
+                    state = table[state * width + column]
+                    if state < 0:
+                        break
+            else:
+                for position, column in enumerate(columns, self.offset + 1):
+                    state = table[state * width + column]
+                    if state < 0:
+                        break
+                    if accepting[state]:
+                        offsets.append(position)
+
+        self.state = state
+        self.offset += len(columns)
+        return offsets
+
+    def feed_file(self, path, chunk_size=1 << 20):
+        # Memory-maps the file and feeds it chunk by chunk; returns all reported offsets
+        offsets = [] if self.report_offsets else None
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return offsets
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for start in range(0, len(mapped), chunk_size):
+                    if self.state < 0:
+                        # Dead state: the rest of the file cannot change the result, only the offset
+                        self.offset += len(mapped) - start
+                        break
+                    found = self.feed(mapped[start:start + chunk_size])
+                    if offsets is not None:
+                        offsets.extend(found)
+        return offsets
+
+    def accepted(self):
+        return self.state >= 0 and self.accepting[self.state] == 1
+
+class _PatternShard:
+    # A group of patterns combined by subset construction into one DFA whose states carry the set of
+    # pattern ids they accept; that DFA is minimized with the tag sets as initial classes
+
+    def __init__(self, pattern_ids, patterns, max_states=None):
+        self.pattern_ids = list(pattern_ids)
+        self.build(patterns, max_states)
+
+    def build(self, patterns, max_states=None):
+        # Union of the pattern DFAs as one NFA over disjoint bit ranges, one bit per pattern state
+        alphabet = []
+        for pattern_id in self.pattern_ids:
+            alphabet.extend(symbol for symbol in patterns[pattern_id].alphabet if symbol not in alphabet)
+        symbol_ids = {symbol: index for index, symbol in enumerate(alphabet)}
+        num_symbols = len(alphabet)
+
+        successors = []
+        initial_mask = 0
+        final_masks = []
+        for pattern_id in self.pattern_ids:
+            dfa = patterns[pattern_id]
+            offset = len(successors)
+            state_ids = {state: offset + index for index, state in enumerate(dfa.states)}
+            for state in dfa.states:
+                row = [0] * num_symbols
+                for symbol, target in dfa.transitions.get(state, {}).items():
+                    target = _single_target(target)
+                    if target is not None:
+                        row[symbol_ids[symbol]] = 1 << state_ids[target]
+                successors.append(row)
+            initial_mask |= 1 << state_ids[dfa.initial_state]
+            final_mask = 0
+            for state in dfa.final_states:
+                final_mask |= 1 << state_ids[state]
+            final_masks.append((pattern_id, final_mask))
+
+        # Subset construction, with the empty subset left out and then added back as the sink
+        masks, targets = _discover(initial_mask, lambda mask: _mask_successors(mask, successors, num_symbols), 0, max_states, "Multi-pattern construction")
+        sink = len(masks)
+        targets = [[sink if target is None else target for target in row] for row in targets]
+        targets.append([sink] * num_symbols)
+        tags = [frozenset(pattern_id for pattern_id, final_mask in final_masks if mask & final_mask) for mask in masks]
+        tags.append(frozenset())
+
+        # Minimize with the tag sets as initial classes, then renumber so the sink class is DEAD_STATE
+        block_of = _hopcroft_partition(targets, tags)
+        class_ids = {block_of[sink]: CompiledDFA.DEAD_STATE}
+        representatives = []
+        for state in range(sink):
+            if block_of[state] not in class_ids:
+                class_ids[block_of[state]] = len(representatives)
+                representatives.append(state)
+
+        self.symbol_ids = symbol_ids
+        self.width = num_symbols
+        self.table = array('i', [class_ids[block_of[target]] for state in representatives for target in targets[state]])
+        self.tags = [tags[state] for state in representatives]
+        self.initial = class_ids[block_of[0]]
+
+    def match(self, word):
+        state, table, width, symbol_ids = self.initial, self.table, self.width, self.symbol_ids
+        for symbol in word:
+            if state < 0:
+                return None
+            index = symbol_ids.get(symbol)
+            if index is None:
+                return None
+            state = table[state * width + index]
+        return self.tags[state] if state >= 0 else None
+
+class MultiPatternMatcher:
+    # Runs many automata in a few passes. Each pattern is determinized and minimized once when added,
+    # and the patterns are kept in shards that are each combined into one tagged DFA (_PatternShard).
+    # Patterns added since the last match form a new shard, which is merged with the previous one
+    # while it is at least as large, so every pattern is recombined O(log n) times in total and
+    # match() walks O(log n) tables. Removing a pattern rebuilds only the shard that held it.
+    # build() combines every pattern into a single shard.
+
+    def __init__(self, patterns=None, max_states=None):
+        self.max_states = max_states
+        self.patterns = {}                          # pattern id -> minimized DFA
+        self.shards = []
+        self.shard_of = {}                          # pattern id -> shard, for patterns already combined
+        self.pending = []                           # pattern ids added since the last match
+        self.stale = False                          # some shard lost a pattern and must be rebuilt
+        self.empty = frozenset()
+        for pattern_id, automaton in (patterns or {}).items():
+            self.add_pattern(pattern_id, automaton)
+
+    def add_pattern(self, pattern_id, automaton):
+        dfa = automaton if automaton.is_dfa else automaton.convert_to_dfa(max_states=self.max_states)
+        if pattern_id in self.patterns:
+            self.remove_pattern(pattern_id)
+        self.patterns[pattern_id] = dfa.minimize_dfa()
+        self.pending.append(pattern_id)
+
+    def remove_pattern(self, pattern_id):
+        del self.patterns[pattern_id]
+        shard = self.shard_of.pop(pattern_id, None)
+        if shard is None:
+            self.pending.remove(pattern_id)
+        else:
+            shard.pattern_ids.remove(pattern_id)
+            shard.table = None
+            self.stale = True
+
+    def _new_shard(self, pattern_ids):
+        shard = _PatternShard(pattern_ids, self.patterns, self.max_states)
+        for pattern_id in pattern_ids:
+            self.shard_of[pattern_id] = shard
+        return shard
+
+    def _update(self):
+        if self.stale:
+            shards = []
+            for shard in self.shards:
+                if shard.table is None and shard.pattern_ids:
+                    shard.build(self.patterns, self.max_states)
+                if shard.pattern_ids:
+                    shards.append(shard)
+            self.shards = shards
+            self.stale = False
+        if self.pending:
+            self.shards.append(self._new_shard(self.pending))
+            self.pending = []
+            while len(self.shards) > 1 and len(self.shards[-1].pattern_ids) >= len(self.shards[-2].pattern_ids):
+                newer = self.shards.pop()
+                older = self.shards.pop()
+                self.shards.append(self._new_shard(older.pattern_ids + newer.pattern_ids))
+
+    def build(self):
+        self.pending = [pattern_id for pattern_id in self.patterns]
+        self.shards = []
+        self.shard_of = {}
+        self.stale = False
+        self._update()
+
+    def match(self, word):
+        # Returns the ids of every pattern that accepts the word
+        if self.pending or self.stale:
+            self._update()
+        result = self.empty
+        for shard in self.shards:
+            tags = shard.match(word)
+            if tags:
+                result = result | tags if result else tags
+        return result
+
+    def match_many(self, words):
+        return [self.match(word) for word in words]
+
+    def num_states(self):
+        # States over all shard tables
+        if self.pending or self.stale:
+            self._update()
+        return sum(len(shard.tags) for shard in self.shards)
+
+class StepLimitError(ValueError):
+    pass
+
+def _sweep_target(tape, head, move, stops):
+    # First cell from head in the direction of move holding one of the stop symbols, or len(tape) / -1
+    # past the end. The search window grows fourfold from one page, so a sweep costs time proportional
+    # to the distance moved rather than to the rest of the tape.
+    window = 4096
+    if move > 0:
+        start = head
+        while start < len(tape):
+            end = min(start + window, len(tape))
+            target = -1
+            for stop in stops:
+                position = tape.find(stop, start, end)
+                if position >= 0:
+                    target = end = position     # Later stops only need to be searched before this one
+            if target >= 0:
+                return target
+            start = end
+            window *= 4
+        return len(tape)
+    end = head + 1
+    while end > 0:
+        start = max(end - window, 0)
+        target = -1
+        for stop in stops:
+            position = tape.rfind(stop, start, end)
+            if position >= 0:
+                target = position
+                start = position + 1
+        if target >= 0:
+            return target
+        end = start
+        window *= 4
+    return -1
+
+class TuringMachine:
+    # Table-driven single-tape machine. transitions map (state, symbol) -> (new_state, write_symbol, "L" or "R").
+    # The machine halts in an accept/reject state or when no transition applies; max_steps and timeout
+    # (seconds) bound the run and raise StepLimitError when exceeded.
+
+    def __init__(self, transitions, tape, initial_state="q0", accept_states=(), reject_states=(), blank_symbol="B", head_position=0, max_steps=None, timeout=None):
+        self.blank_symbol = blank_symbol
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.steps = 0
+
+        # Integer ids; the blank symbol is always 0 so fresh tape cells are zero bytes
+        self.symbol_names = [blank_symbol]
+        self.symbol_ids = {blank_symbol: 0}
+        self.state_names = []
+        self.state_ids = {}
+        for (state, symbol), (new_state, write_symbol, _) in transitions.items():
+            for name in (state, new_state):
+                self._state_id(name)
+            for name in (symbol, write_symbol):
+                self._symbol_id(name)
+        for name in (initial_state, *accept_states, *reject_states):
+            self._state_id(name)
+        tape_ids = bytes(self._symbol_id(symbol) for symbol in tape)
+        if len(self.symbol_names) > 256:
+            raise ValueError("Turing machines support at most 256 tape symbols.")
+
+        # Flat table: table[state * width + symbol] -> (new_state, write_symbol, move) or None
+        width = self.width = len(self.symbol_names)
+        self.table = [None] * (len(self.state_names) * width)
+        for (state, symbol), (new_state, write_symbol, direction) in transitions.items():
+            move = 1 if direction == "R" else -1
+            self.table[self.state_ids[state] * width + self.symbol_ids[symbol]] = (self.state_ids[new_state], self.symbol_ids[write_symbol], move)
+
+        self.accepting = [name in accept_states for name in self.state_names]
+        self.halting = [name in accept_states or name in reject_states for name in self.state_names]
+
+        # Sweeps: symbols a state passes over unchanged while looping in one direction are skipped
+        # with bytearray.find/rfind instead of one Python iteration per cell
+        self.sweeps = [None] * len(self.state_names)
+        for state in range(len(self.state_names)):
+            for move in (1, -1):
+                passed = {symbol for symbol in range(width) if self.table[state * width + symbol] == (state, symbol, move)}
+                if passed:
+                    self.sweeps[state] = (move, bytes(symbol for symbol in range(width) if symbol not in passed), 0 in passed)
+
+        self.tape = bytearray(tape_ids) or bytearray(1)
+        self.head = head_position
+        self.state = self.state_ids[initial_state]
+
+    def _state_id(self, name):
+        if name not in self.state_ids:
+            self.state_ids[name] = len(self.state_names)
+            self.state_names.append(name)
+        return self.state_ids[name]
+
+    def _symbol_id(self, name):
+        if name not in self.symbol_ids:
+            self.symbol_ids[name] = len(self.symbol_names)
+            self.symbol_names.append(name)
+        return self.symbol_ids[name]
+
+    @property
+    def current_state(self):
+        return self.state_names[self.state]
+
+    @property
+    def head_position(self):
+        return self.head
+
+    def _grow(self):
+        # Extends the tape with blanks on the side the head fell off, doubling its size
+        if self.head < 0:
+            extra = max(len(self.tape), 64)
+            self.tape[0:0] = bytes(extra)
+            self.head += extra
+        elif self.head >= len(self.tape):
+            self.tape.extend(bytes(max(len(self.tape), 64)))
+
     def step(self):
-        current_symbol = self.tape[self.head_position]
-        if (self.current_state, current_symbol) in self.transitions:
-            new_state, write_symbol, direction = self.transitions[(self.current_state, current_symbol)]
-            self.tape[self.head_position] = write_symbol            # Write the symbol
-            self.current_state = new_state                          # Update the state
-            self.head_position += 1 if direction == "R" else -1     # Move the head
+        # Applies a single transition; returns False if the machine has halted
+        if self.halting[self.state]:
+            return False
+        if not 0 <= self.head < len(self.tape):
+            self._grow()
+        entry = self.table[self.state * self.width + self.tape[self.head]]
+        if entry is None:
+            return False
+        self.state, self.tape[self.head], move = entry
+        self.head += move
+        self.steps += 1
+        return True
 
     def run(self):
-        while self.current_state != "q1":
-            self.step()
+        tape, table, width, halting, sweeps = self.tape, self.table, self.width, self.halting, self.sweeps
+        state, head, steps = self.state, self.head, self.steps
+        budget = self.max_steps
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        iterations = 0
+
+        try:
+            while not halting[state]:
+                if budget is not None and steps >= budget:
+                    raise StepLimitError(f"Turing machine exceeded {budget} steps.")
+                iterations += 1
+                if deadline is not None and not iterations & 0xFFFF and time.monotonic() > deadline:
+                    raise StepLimitError(f"Turing machine exceeded {self.timeout} seconds after {steps} steps.")
+                if not 0 <= head < len(tape):
+                    self.head = head
+                    self._grow()
+                    head = self.head
+
+                sweep = sweeps[state]
+                if sweep is not None and tape[head] not in sweep[1]:
+                    move, stops, passes_blank = sweep
+                    # Most sweeps end on the next cell; only search when they do not
+                    target = head + move
+                    if not (0 <= target < len(tape) and tape[target] in stops):
+                        target = _sweep_target(tape, head, move, stops)
+                    distance = abs(target - head)
+                    if budget is not None and steps + distance > budget:
+                        head += move * (budget - steps)
+                        steps = budget
+                        continue
+                    if (target == len(tape) or target < 0) and passes_blank:
+                        # Every cell beyond the tape is blank, so the sweep never ends
+                        raise StepLimitError("Turing machine never halts: endless sweep over blank cells.")
+                    steps += distance
+                    head = target
+                    if not 0 <= head < len(tape):
+                        continue
+
+                entry = table[state * width + tape[head]]
+                if entry is None:
+                    break
+                state, tape[head], move = entry
+                head += move
+                steps += 1
+        finally:
+            self.state, self.head, self.steps = state, head, steps
+
+        return self.accepting[state]
 
     def get_tape(self):
-        return "".join(self.tape).rstrip(self.blank_symbol)
+        return "".join(self.symbol_names[symbol] for symbol in bytes(self.tape).strip(b"\x00"))
 
-class TuringMachine_BalanceParantheses:
-    def __init__(self, tape, blank_symbol="B"):
-        self.tape = list(tape) + [blank_symbol]
-        self.blank_symbol = blank_symbol
-        self.head_position = 0                      # Start at the first position of the tape
-        self.current_state = "q0" 
-        self.transitions = self._define_transitions()
+class TuringMachine_BinaryIncrement(TuringMachine):
+    def __init__(self, tape, blank_symbol="B", max_steps=None, timeout=None):
+        super().__init__(
+            self._define_transitions(blank_symbol),
+            tape,
+            initial_state="q0",
+            accept_states=["q1"],
+            blank_symbol=blank_symbol,
+            head_position=len(tape) - 1,            # Start at the last position of the tape
+            max_steps=max_steps,
+            timeout=timeout
+        )
+
+    def _define_transitions(self, blank_symbol):
+        return {
+            ("q0", "1"): ("q0", "0", "L"),          # Replace '1' with '0' and go to the left
+            ("q0", "0"): ("q1", "1", "R"),          # Replace '0' with '1' and go to the final state
+            ("q0", blank_symbol): ("q1", "1", "R"), # If you reach the beginning of the tape, add '1'
+        }
+
+class TuringMachine_BalanceParantheses(TuringMachine):
+    def __init__(self, tape, blank_symbol="B", max_steps=None, timeout=None):
+        super().__init__(
+            self._define_transitions(blank_symbol),
+            tape,
+            initial_state="q0",
+            accept_states=["q_accept"],
+            reject_states=["q_reject"],
+            blank_symbol=blank_symbol,
+            head_position=0,                        # Start at the first position of the tape
+            max_steps=max_steps,
+            timeout=timeout
+        )
 
-    def _define_transitions(self):
+    def _define_transitions(self, blank_symbol):
         return {
 
             # State q0: Search for the next '(' to mark
@@ -169,16 +1310,16 @@ class TuringMachine_BalanceParantheses:
             ("q0", "X"): ("q0", "X", "R"),          # Ignore 'X' and continue right
             ("q0", "Y"): ("q0", "Y", "R"),          # Ignore 'Y' and continue right
             ("q0", ")"): ("q_reject", ")", "R"),    # Reject if ')' doesn't have a corresponding '('
-            ("q0", "B"): ("q_accept", "B", "R"),    # Accept if there are no unbalanced parentheses at the end
-            
+            ("q0", blank_symbol): ("q_accept", blank_symbol, "R"),  # Accept if there are no unbalanced parentheses at the end
+
             # State q1: Search for the next ')' to mark
 
             ("q1", "("): ("q1", "(", "R"),          # Ignore '(' and continue right
             ("q1", "X"): ("q1", "X", "R"),          # Ignore 'X' and continue right
             ("q1", "Y"): ("q1", "Y", "R"),          # Ignore 'Y' and continue right
             ("q1", ")"): ("q2", "Y", "L"),          # Mark ')' as 'Y' and go back to the left
-            ("q1", "B"): ("q_reject", "B", "L"),    # Reject if there is no ')' to mark
-            
+            ("q1", blank_symbol): ("q_reject", blank_symbol, "L"),  # Reject if there is no ')' to mark
+
             # State q2: Go back to the beginning to search for the next '('
 
             ("q2", "("): ("q2", "(", "L"),          # Go back to the left over '('
@@ -187,20 +1328,3 @@ class TuringMachine_BalanceParantheses:
             ("q2", "Y"): ("q2", "Y", "L"),          # Go back to the left over 'Y'
 
         }
-
-    def step(self):
-        current_symbol = self.tape[self.head_position]
-        if (self.current_state, current_symbol) in self.transitions:
-            new_state, write_symbol, direction = self.transitions[(self.current_state, current_symbol)]
-            self.tape[self.head_position] = write_symbol            # Write the symbol
-            self.current_state = new_state                          # Update the state
-            self.head_position += 1 if direction == "R" else -1     # Move the head
-
-    def run(self):
-        while self.current_state not in ["q_accept", "q_reject"]:
-            self.step()
-        return self.current_state == "q_accept"
-
-    def get_tape(self):
-        return "".join(self.tape).rstrip(self.blank_symbol)
-
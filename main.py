@@ -1,14 +1,17 @@
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox, simpledialog
 from functions import Automaton, TuringMachine_BinaryIncrement, TuringMachine_BalanceParantheses
-from misc import check_equivalence, generate_automaton_image, generate_txt_report, simulate_word
+from misc import generate_automaton_image_async, generate_txt_report, simulate_word
+from profiling import CancellableProfiler, OperationCancelled
 
 
 class AutomatonApp:
     def __init__(self, root):
         self.root = root
         self.root.title("GUI")
-        self.root.geometry("400x400")
+        self.root.geometry("400x500")
 
         self.testAutomaton = Automaton(
             states=['q0', 'q1', 'q2'],
@@ -26,7 +29,15 @@ class AutomatonApp:
         self.automaton = None
         self.converted_automaton = None
         self.minimized_automaton = None
+
+        # Long operations run on a worker thread; progress events are handed back through a queue
+        # and polled from the Tk main loop, which is the only thread that touches widgets
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        self.task = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
+        self.root.after(100, self.poll_events)
 
     def create_widgets(self):
         tk.Button(self.root, text="Run Test Automaton", command=self.run_test_automaton).pack(pady=10)
@@ -37,13 +48,73 @@ class AutomatonApp:
         tk.Button(self.root, text="Check Equivalence", command=self.check_equivalence).pack(pady=10)
         tk.Button(self.root, text="Generate .txt File", command=self.generate_txt_file).pack(pady=10)
         tk.Button(self.root, text="Run Turing Machines", command=self.run_turing_machines).pack(pady=10)
+        self.status_label = tk.Label(self.root, text="Ready")
+        self.status_label.pack(pady=5)
+        self.cancel_button = tk.Button(self.root, text="Cancel", command=self.cancel_task, state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+
+    def start_task(self, description, function, on_success):
+        # Runs function(profiler) on the worker thread and calls on_success(result) on the UI thread
+        if self.task is not None:
+            messagebox.showwarning("Busy", "Another operation is still running.")
+            return
+        profiler = CancellableProfiler(callback=lambda event, operation, data: self.events.put((event, operation, data)), progress_interval=500)
+        self.task = (description, profiler, self.executor.submit(function, profiler), on_success)
+        self.status_label.config(text=f"{description}...")
+        self.cancel_button.config(state=tk.NORMAL)
+
+    def render_image(self, automaton, image_name):
+        # Images are rendered in the background; failures (e.g. Graphviz not installed) come back as events
+        def on_done(future):
+            if not future.cancelled() and future.exception() is not None:
+                self.events.put(("error", "generate_automaton_image", {"image": image_name, "error": future.exception()}))
+        generate_automaton_image_async(automaton, image_name=image_name).add_done_callback(on_done)
+
+    def poll_events(self):
+        # Runs for the lifetime of the window so render failures are shown even when no task is running
+        while not self.events.empty():
+            event, operation, data = self.events.get_nowait()
+            if event == "progress" and self.task is not None:
+                details = ", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in data.items())
+                self.status_label.config(text=f"{self.task[0]}... {details}")
+            elif event == "error":
+                messagebox.showerror("Error", f"Could not generate the image {data['image']}: {data['error']}")
+        if self.task is not None and self.task[2].done():
+            self.finish_task()
+        self.root.after(100, self.poll_events)
+
+    def finish_task(self):
+        description, profiler, future, on_success = self.task
+        self.task = None
+        self.cancel_button.config(state=tk.DISABLED)
+        try:
+            result = future.result()
+        except OperationCancelled:
+            self.status_label.config(text=f"{description} cancelled")
+            return
+        except Exception as error:
+            self.status_label.config(text=f"{description} failed")
+            messagebox.showerror("Error", str(error))
+            return
+        self.status_label.config(text="Ready")
+        on_success(result)
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task[1].cancel()
+            self.status_label.config(text=f"Cancelling {self.task[0].lower()}...")
+
+    def on_close(self):
+        # Stop a running operation so the worker thread does not keep the process alive
+        self.cancel_task()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
 
     def run_test_automaton(self):
         self.show_automaton(self.testAutomaton)
-        generate_automaton_image(self.testAutomaton, image_name="inserted_automaton")
+        self.render_image(self.testAutomaton, "inserted_automaton")
         self.automaton = self.testAutomaton
-        self.convert_to_dfa()
-        self.minimize_dfa()
+        self.convert_to_dfa(then=self.minimize_dfa)
     
     def insert_automaton(self):
         states = simpledialog.askstring("Input", "Enter states separated by commas (e.g.: q0,q1,...):").split(",")
@@ -59,26 +130,36 @@ class AutomatonApp:
         is_dfa = simpledialog.askstring("Input", "Is it a DFA (Deterministic Finite Automaton)?\nY for yes, N for no:").lower() == "y"
         self.automaton = Automaton(states, alphabet, transitions, initial_state, final_states, is_dfa)
         self.show_automaton(self.automaton)
-        generate_automaton_image(self.automaton, image_name="inserted_automaton") 
+        self.render_image(self.automaton, "inserted_automaton")
 
-    def convert_to_dfa(self):
+    def convert_to_dfa(self, then=None):
         if self.automaton:
-            self.converted_automaton = self.automaton.convert_to_dfa()
-            messagebox.showinfo("Success", "Automaton converted successfully.")
-            self.show_automaton(self.converted_automaton)
-            generate_automaton_image(self.converted_automaton, image_name="converted_automaton")
+            automaton = self.automaton
+            self.start_task("Converting to DFA", lambda profiler: automaton.convert_to_dfa(profiler=profiler), lambda result: self.on_converted(result, then))
         else:
             messagebox.showwarning("Error", "No automaton to convert.")
 
+    def on_converted(self, converted_automaton, then=None):
+        self.converted_automaton = converted_automaton
+        messagebox.showinfo("Success", "Automaton converted successfully.")
+        self.show_automaton(self.converted_automaton)
+        self.render_image(self.converted_automaton, "converted_automaton")
+        if then is not None:
+            then()
+
     def minimize_dfa(self):
         if self.converted_automaton:
-            self.minimized_automaton = self.converted_automaton.minimize_dfa()
-            messagebox.showinfo("Success", "DFA minimized successfully.")
-            self.show_automaton(self.minimized_automaton)
-            generate_automaton_image(self.minimized_automaton, image_name="minimized_automaton")
+            converted_automaton = self.converted_automaton
+            self.start_task("Minimizing DFA", lambda profiler: converted_automaton.minimize_dfa(profiler=profiler), self.on_minimized)
         else:
             messagebox.showwarning("Error", "No DFA to minimize.")
 
+    def on_minimized(self, minimized_automaton):
+        self.minimized_automaton = minimized_automaton
+        messagebox.showinfo("Success", "DFA minimized successfully.")
+        self.show_automaton(self.minimized_automaton)
+        self.render_image(self.minimized_automaton, "minimized_automaton")
+
     def simulate_word(self):
         if self.automaton or self.converted_automaton:
             word = simpledialog.askstring("Input", "Enter the word to be simulated:")
@@ -95,13 +176,17 @@ class AutomatonApp:
 
     def check_equivalence(self):
         if self.automaton and self.converted_automaton:
-            if check_equivalence(self.automaton, self.converted_automaton):
-                messagebox.showinfo("Equivalence Check", "The automata are equivalent.")
-            else:
-                messagebox.showinfo("Equivalence Check", "The automata are not equivalent.")
+            automaton, converted_automaton = self.automaton, self.converted_automaton
+            self.start_task("Checking equivalence", lambda profiler: automaton.find_distinguishing_word(converted_automaton, profiler), self.on_equivalence_checked)
         else:
             messagebox.showwarning("Error", "Both automata must be available for equivalence check.")
 
+    def on_equivalence_checked(self, word):
+        if word is None:
+            messagebox.showinfo("Equivalence Check", "The automata are equivalent.")
+        else:
+            messagebox.showinfo("Equivalence Check", f"The automata are not equivalent.\nDistinguishing word: '{word}'")
+
     def generate_txt_file(self):
         if self.automaton and self.converted_automaton and self.minimized_automaton:
             generate_txt_report(self.automaton, self.converted_automaton, self.minimized_automaton)
@@ -1,8 +1,30 @@
-import os, graphviz
-from itertools import product
+import os, hashlib, json, mmap, struct, sys, graphviz
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functions import Automaton, CompiledDFA, NumberedStates
+from profiling import phase
 
-def generate_automaton_image(automaton_instance, image_name="automaton_image", image_format="png"):
+# Renders run one at a time on this worker so the caller (e.g. the GUI) never waits on Graphviz
+_render_executor = ThreadPoolExecutor(max_workers=1)
+
+def automaton_hash(automaton_instance):
+    # Stable hash of the automaton's structure (state/symbol order and transition order included)
+    transitions = {state: {symbol: sorted(automaton_instance.get_next_states(state, symbol)) for symbol in automaton_instance.alphabet} for state in automaton_instance.states}
+    data = [list(automaton_instance.states), list(automaton_instance.alphabet), transitions, automaton_instance.initial_state, sorted(automaton_instance.final_states)]
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+def build_automaton_graph(automaton_instance, max_states=200):
+    # Parallel edges are merged into one edge labeled with all of their symbols. Automata with more
+    # than max_states states are drawn as a single summary node instead.
     dot = graphviz.Digraph()
+    if max_states is not None and len(automaton_instance.states) > max_states:
+        num_transitions = sum(len(automaton_instance.get_next_states(state, symbol)) for state in automaton_instance.states for symbol in automaton_instance.alphabet)
+        summary = (f"{len(automaton_instance.states)} states\\n{len(automaton_instance.final_states)} final states\\n"
+                   f"{num_transitions} transitions\\nalphabet: {', '.join(automaton_instance.alphabet)}\\ninitial: {automaton_instance.initial_state}")
+        dot.node('summary', summary, shape='box')
+        return dot
+
     for state in automaton_instance.states:
         if state in automaton_instance.final_states:
             dot.node(state, state, shape='doublecircle', style='filled', fillcolor='green')
@@ -11,24 +33,72 @@ def generate_automaton_image(automaton_instance, image_name="automaton_image", i
     dot.node('start', shape='point', height='0', width='0')
     dot.edge('start', automaton_instance.initial_state, arrowhead='vee')
 
+    known_states = set(automaton_instance.states)
     for state in automaton_instance.states:
+        labels = {}
         for symbol in automaton_instance.alphabet:
-            next_states = automaton_instance.transitions[state].get(symbol, [])
-            for next_state in next_states:
-                if next_state not in automaton_instance.states:
-                    continue
-                dot.edge(state, next_state, symbol)
+            for next_state in sorted(automaton_instance.get_next_states(state, symbol)):
+                if next_state in known_states:
+                    labels.setdefault(next_state, []).append(symbol)
+        for next_state, symbols in labels.items():
+            dot.edge(state, next_state, ", ".join(symbols))
+    return dot
 
+def generate_automaton_image(automaton_instance, image_name="automaton_image", image_format="png", view=True, max_states=200, profiler=None):
     # Create the directory if it doesn't exist
     output_dir = "img"
     os.makedirs(output_dir, exist_ok=True)
-    
+    output_path = os.path.join(output_dir, f"{image_name}.{image_format}")
+    hash_path = output_path + ".sha256"
+
+    # Skip rendering when the image on disk was produced from the same structure and options
+    with phase(profiler, "generate_automaton_image", "hash"):
+        digest = f"{automaton_hash(automaton_instance)}:{max_states}"
+    if os.path.exists(output_path) and os.path.exists(hash_path):
+        with open(hash_path) as file:
+            if file.read() == digest:
+                if profiler is not None:
+                    profiler.count("generate_automaton_image", "cache_hits")
+                if view:
+                    graphviz.view(output_path)
+                return output_path
+
+    with phase(profiler, "generate_automaton_image", "build"):
+        dot = build_automaton_graph(automaton_instance, max_states)
+
     # Cleanup = True
-    output_path = dot.render(filename=os.path.join(output_dir, image_name), format=image_format, view=True, cleanup=True)
+    with phase(profiler, "generate_automaton_image", "render"):
+        output_path = dot.render(filename=os.path.join(output_dir, image_name), format=image_format, view=view, cleanup=True)
+    with open(hash_path, "w") as file:
+        file.write(digest)
     print(f"Graph saved as {output_path}")
+    return output_path
 
+def generate_automaton_image_async(automaton_instance, image_name="automaton_image", image_format="png", view=True, max_states=200, profiler=None):
+    # Same as generate_automaton_image, but returns a Future right away
+    return _render_executor.submit(generate_automaton_image, automaton_instance, image_name, image_format, view, max_states, profiler)
+
+def simulate_word(automaton_instance, word, profiler=None):
+    if profiler is None:
+        return _simulate_word(automaton_instance, word)
+    with profiler.phase("simulate_word", "simulate"):
+        result = _simulate_word(automaton_instance, word)
+    profiler.count("simulate_word", "words")
+    profiler.count("simulate_word", "symbols", len(word))
+    return result
+
+def _simulate_word(automaton_instance, word):
+    if automaton_instance.is_dfa:
+        # Deterministic walk, no per-symbol set allocation
+        state = automaton_instance.initial_state
+        transitions = automaton_instance.transitions
+        for symbol in word:
+            target = transitions.get(state, {}).get(symbol)
+            if not target:
+                return False
+            state = target if isinstance(target, str) else next(iter(target))
+        return state in automaton_instance.final_states
 
-def simulate_word(automaton_instance, word):
     current_states = {automaton_instance.initial_state}
     for symbol in word:
         next_states = set()
@@ -37,14 +107,21 @@ def simulate_word(automaton_instance, word):
         current_states = next_states
     return any(state in automaton_instance.final_states for state in current_states)
 
-def check_equivalence(automaton1, automaton2):
-    # Checking equivalence is complex; here we only check if both accept the same words up to a given length
-    for word_length in range(5):
-        for word in product(automaton1.alphabet, repeat=word_length):
-            word = ''.join(word)
-            if simulate_word(automaton1, word) != simulate_word(automaton2, word):
-                return False
-    return True
+def simulate_words(automaton_instance, words, cache_size=10000, profiler=None):
+    # Batch simulation: DFAs are compiled once to an integer table and reused for every word,
+    # NFAs are determinized lazily with a bounded subset cache shared across the batch
+    with phase(profiler, "simulate_words", "compile"):
+        matcher = automaton_instance.compile() if automaton_instance.is_dfa else automaton_instance.lazy_dfa(cache_size)
+    with phase(profiler, "simulate_words", "simulate"):
+        results = matcher.accepts_many(words)
+    if profiler is not None:
+        profiler.count("simulate_words", "words", len(words))
+        profiler.count("simulate_words", "symbols", sum(len(word) for word in words))
+    return results
+
+def check_equivalence(automaton1, automaton2, profiler=None):
+    # Exact check: searches the product of both automata for a word accepted by only one of them
+    return automaton1.find_distinguishing_word(automaton2, profiler) is None
 
 def generate_txt_report(automaton1, automaton2, minimized_automaton, filename="report_automaton.txt"):
     with open(filename, 'w') as file:
@@ -79,4 +156,299 @@ def generate_txt_report(automaton1, automaton2, minimized_automaton, filename="r
                 next_states = minimized_automaton.get_next_states(state, symbol)
                 file.write(f"  {state} --{symbol}--> {', '.join(next_states)}\n")
         file.write(f"Initial State: {minimized_automaton.initial_state}\n")
-        file.write(f"Final States: {', '.join(minimized_automaton.final_states)}\n")
\ No newline at end of file
+        file.write(f"Final States: {', '.join(minimized_automaton.final_states)}\n")
+
+# JSON format (version 1), one object per automaton:
+#   {"version": 1, "states": [str, ...], "alphabet": [str, ...],
+#    "transitions": {state: {symbol: [state, ...] (NFA) or state (DFA)}},
+#    "initial_state": str, "final_states": [str, ...], "is_dfa": bool}
+# "version" may be omitted; missing transitions mean no move.
+
+JSON_VERSION = 1
+
+def automaton_to_dict(automaton_instance):
+    return {
+        "version": JSON_VERSION,
+        "states": list(automaton_instance.states),
+        "alphabet": list(automaton_instance.alphabet),
+        "transitions": automaton_instance.transitions,
+        "initial_state": automaton_instance.initial_state,
+        "final_states": list(automaton_instance.final_states),
+        "is_dfa": automaton_instance.is_dfa,
+    }
+
+def automaton_from_dict(data):
+    if data.get("version", JSON_VERSION) > JSON_VERSION:
+        raise ValueError(f"Unsupported automaton format version: {data['version']}")
+    return Automaton(
+        states=list(data["states"]),
+        alphabet=list(data["alphabet"]),
+        transitions=data["transitions"],
+        initial_state=data["initial_state"],
+        final_states=list(data["final_states"]),
+        is_dfa=bool(data.get("is_dfa", False))
+    )
+
+def load_automata(path):
+    # A .jsonl file holds one automaton per line, a .json file a single automaton, anything else is binary
+    if not path.endswith((".json", ".jsonl")):
+        return [load_automaton(path)]
+    with open(path) as file:
+        if path.endswith(".jsonl"):
+            return [automaton_from_dict(json.loads(line)) for line in file if line.strip()]
+        return [automaton_from_dict(json.load(file))]
+
+# Binary format (version 1), little-endian, every section padded to 4 bytes:
+#   header   magic b"AUTB", version, flags, num_states, num_symbols, initial (-1 if none),
+#            names_length, num_targets  (struct "<4sIIIIiII")
+#   names    UTF-8 JSON {"alphabet": [...], "states": [...]}; "states" is omitted when the
+#            states are named "0".."n-1" (flag NUMBERED)
+#   accepting  one byte per state
+#   DFA      int32 table[num_states * num_symbols], -1 for no transition
+#   NFA      int32 offsets[num_states * num_symbols + 1] and int32 targets[num_targets]:
+#            the targets of (state, symbol) are targets[offsets[i]:offsets[i + 1]], i = state * num_symbols + symbol
+
+BINARY_MAGIC = b"AUTB"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sIIIIiII")
+FLAG_DFA = 1
+FLAG_NUMBERED = 2
+
+def _padding(length):
+    return b"\0" * (-length % 4)
+
+def _write_ints(file, values):
+    if sys.byteorder == "big":
+        values = array('i', values)
+        values.byteswap()
+    values.tofile(file)
+
+def save_automaton(automaton_instance, path):
+    # .json files use the JSON format, any other extension the binary format
+    if path.endswith(".json"):
+        with open(path, "w") as file:
+            json.dump(automaton_to_dict(automaton_instance), file)
+        return
+
+    states = list(automaton_instance.states)
+    alphabet = list(automaton_instance.alphabet)
+    flags = 0
+    if automaton_instance.is_dfa:
+        flags |= FLAG_DFA
+        compiled = automaton_instance.compile()
+        states = list(compiled.state_names)
+        accepting = bytes(compiled.accepting)
+        initial = compiled.initial
+        arrays = [compiled.table]
+        num_targets = 0
+    else:
+        ids = {state: index for index, state in enumerate(states)}
+        for trans in automaton_instance.transitions.values():
+            for target in trans.values():
+                for state in ([target] if isinstance(target, str) else target):
+                    if state not in ids:
+                        ids[state] = len(states)
+                        states.append(state)
+        offsets = array('i', [0])
+        targets = array('i')
+        for state in states:
+            trans = automaton_instance.transitions.get(state, {})
+            for symbol in alphabet:
+                target = trans.get(symbol) or []
+                targets.extend(ids[next_state] for next_state in ([target] if isinstance(target, str) else target))
+                offsets.append(len(targets))
+        final_states = set(automaton_instance.final_states)
+        accepting = bytes(1 if state in final_states else 0 for state in states)
+        initial = ids.get(automaton_instance.initial_state, -1)
+        arrays = [offsets, targets]
+        num_targets = len(targets)
+
+    names = {"alphabet": alphabet}
+    if all(state == str(index) for index, state in enumerate(states)):
+        flags |= FLAG_NUMBERED
+    else:
+        names["states"] = states
+    names_blob = json.dumps(names).encode("utf-8")
+
+    with open(path, "wb") as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, flags, len(states), len(alphabet), initial, len(names_blob), num_targets))
+        file.write(names_blob + _padding(len(names_blob)))
+        file.write(accepting + _padding(len(accepting)))
+        for values in arrays:
+            _write_ints(file, values)
+
+def _open_binary(path):
+    # Memory-maps a binary automaton; returns the header fields, names and zero-copy views of the sections
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, flags, num_states, num_symbols, initial, names_length, num_targets = BINARY_HEADER.unpack_from(mapped, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"{path} is not a binary automaton file.")
+    if version > BINARY_VERSION:
+        raise ValueError(f"Unsupported binary automaton version: {version}")
+
+    view = memoryview(mapped)
+    offset = BINARY_HEADER.size
+    names = json.loads(bytes(view[offset:offset + names_length]).decode("utf-8"))
+    offset += names_length + (-names_length % 4)
+    accepting = view[offset:offset + num_states]
+    offset += num_states + (-num_states % 4)
+
+    def ints(count):
+        nonlocal offset
+        section = view[offset:offset + 4 * count].cast("i")
+        offset += 4 * count
+        if sys.byteorder == "big":
+            section = array('i', section)
+            section.byteswap()
+        return section
+
+    if flags & FLAG_DFA:
+        sections = [ints(num_states * num_symbols)]
+    else:
+        sections = [ints(num_states * num_symbols + 1), ints(num_targets)]
+    states = NumberedStates(num_states) if flags & FLAG_NUMBERED else names["states"]
+    return mapped, flags, states, names["alphabet"], accepting, initial, sections
+
+def load_compiled_dfa(path):
+    # Fast path for DFAs: the transition table stays in the memory-mapped file
+    mapped, flags, states, alphabet, accepting, initial, sections = _open_binary(path)
+    if not flags & FLAG_DFA:
+        raise ValueError(f"{path} does not contain a DFA.")
+    compiled = CompiledDFA.from_arrays(states, alphabet, sections[0], accepting, initial)
+    compiled.buffer = mapped                        # Keeps the mapping alive as long as the DFA
+    return compiled
+
+def load_automaton(path):
+    if path.endswith(".json"):
+        with open(path) as file:
+            return automaton_from_dict(json.load(file))
+
+    mapped, flags, states, alphabet, accepting, initial, sections = _open_binary(path)
+    if flags & FLAG_DFA:
+        return CompiledDFA.from_arrays(states, alphabet, sections[0], accepting, initial).to_automaton()
+
+    states = list(states)
+    offsets, targets = sections
+    transitions = {}
+    for state_index, state in enumerate(states):
+        transitions[state] = {}
+        for symbol_index, symbol in enumerate(alphabet):
+            index = state_index * len(alphabet) + symbol_index
+            transitions[state][symbol] = [states[target] for target in targets[offsets[index]:offsets[index + 1]]]
+    return Automaton(
+        states=states,
+        alphabet=list(alphabet),
+        transitions=transitions,
+        initial_state=states[initial] if initial >= 0 else None,
+        final_states=[state for index, state in enumerate(states) if accepting[index]],
+        is_dfa=False
+    )
+
+def _modified_time(path):
+    # None when the file has been removed in the meantime
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+class AutomatonCache:
+    # Memoizes convert_to_dfa and minimize_dfa by the input's structural hash. Results are kept in an
+    # in-memory LRU of max_entries and, when directory is given, as binary files there, pruned to the
+    # max_disk_entries most recently used. Several processes may share one directory; between prunes
+    # it can hold up to a tenth more files than max_disk_entries per writing process.
+
+    def __init__(self, max_entries=128, directory=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.prune_interval = max(1, max_disk_entries // 10)
+        self.stores_since_prune = self.prune_interval - 1    # The first store prunes what earlier runs left
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _lookup(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.directory is not None:
+            path = os.path.join(self.directory, f"{key}.aut")
+            try:
+                result = load_automaton(path)
+            except FileNotFoundError:               # Never stored, or pruned by another worker
+                result = None
+            if result is not None:
+                try:
+                    os.utime(path)                  # Mark as recently used for disk eviction
+                except FileNotFoundError:
+                    pass
+                self.disk_hits += 1
+                self._remember(key, result)
+                return result
+        self.misses += 1
+        return None
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _store(self, key, result):
+        self._remember(key, result)
+        if self.directory is None:
+            return
+        # Write to a temporary name first so concurrent workers never read a partial file
+        path = os.path.join(self.directory, f"{key}.aut")
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        save_automaton(result, temporary_path)
+        os.replace(temporary_path, path)
+
+        # Listing the directory is O(entries), so it is only pruned every prune_interval stores
+        self.stores_since_prune += 1
+        if self.stores_since_prune >= self.prune_interval:
+            self.stores_since_prune = 0
+            self._prune()
+
+    def _prune(self):
+        # Other workers may prune the same directory concurrently, so files can vanish at any point
+        cached_files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".aut"):
+                path = os.path.join(self.directory, name)
+                modified = _modified_time(path)
+                if modified is not None:
+                    cached_files.append((modified, path))
+        if len(cached_files) > self.max_disk_entries:
+            cached_files.sort()
+            for _, old_path in cached_files[:len(cached_files) - self.max_disk_entries]:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+    def converted(self, automaton_instance, max_states=None):
+        if automaton_instance.is_dfa:
+            return automaton_instance
+        key = f"{automaton_instance.structural_hash()}-dfa"
+        result = self._lookup(key)
+        if result is None:
+            result = automaton_instance.convert_to_dfa(max_states=max_states)
+            self._store(key, result)
+        return result
+
+    def minimized(self, automaton_instance, max_states=None):
+        # Returns the canonical form of the minimal DFA, so equal languages give identical results
+        key = f"{automaton_instance.structural_hash()}-min"
+        result = self._lookup(key)
+        if result is None:
+            result = self.converted(automaton_instance, max_states).minimize_dfa().canonical_form()
+            self._store(key, result)
+        return result
+
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "cached": len(self.entries)}
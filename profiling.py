@@ -0,0 +1,96 @@
+import threading, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+
+class OperationCancelled(Exception):
+    pass
+
+class Profiler:
+    # Opt-in collector for automaton operations. Pass an instance as profiler= to convert_to_dfa,
+    # minimize_dfa, simulate_word, check_equivalence or generate_automaton_image.
+    # callback(event, operation, data) is called with event "phase" when a phase ends and
+    # "progress" every progress_interval units of work inside long loops.
+
+    def __init__(self, callback=None, track_memory=False, progress_interval=1000):
+        self.callback = callback
+        self.track_memory = track_memory
+        self.progress_interval = progress_interval
+        self.phases = {}                            # "operation.phase" -> seconds
+        self.counters = {}                          # "operation.counter" -> value
+        self.peaks = {}                             # "operation.counter" -> maximum value seen
+
+    @contextmanager
+    def phase(self, operation, name):
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            key = f"{operation}.{name}"
+            self.phases[key] = self.phases.get(key, 0.0) + seconds
+            if self.track_memory:
+                self.peak(operation, "peak_memory_bytes", tracemalloc.get_traced_memory()[1])
+                if started_tracing:
+                    tracemalloc.stop()
+            if self.callback is not None:
+                self.callback("phase", operation, {"phase": name, "seconds": seconds})
+
+    def count(self, operation, name, value=1):
+        key = f"{operation}.{name}"
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def peak(self, operation, name, value):
+        key = f"{operation}.{name}"
+        if value > self.peaks.get(key, value - 1):
+            self.peaks[key] = value
+
+    def progress(self, operation, **data):
+        if self.callback is not None:
+            self.callback("progress", operation, data)
+
+    def report(self):
+        # Totals per operation plus symbols processed per second wherever symbols were counted
+        totals = {}
+        for key, seconds in self.phases.items():
+            operation = key.split(".", 1)[0]
+            totals[operation] = totals.get(operation, 0.0) + seconds
+        rates = {}
+        for key, value in self.counters.items():
+            operation, name = key.split(".", 1)
+            if name == "symbols" and totals.get(operation):
+                rates[f"{operation}.symbols_per_second"] = value / totals[operation]
+        return {"phases": dict(self.phases), "totals": totals, "counters": dict(self.counters), "peaks": dict(self.peaks), "rates": rates}
+
+    def reset(self):
+        self.phases.clear()
+        self.counters.clear()
+        self.peaks.clear()
+
+def phase(profiler, operation, name):
+    # Shortcut so instrumented code stays a single `with` line when profiling is disabled
+    return nullcontext() if profiler is None else profiler.phase(operation, name)
+
+class CancellableProfiler(Profiler):
+    # Raises OperationCancelled from inside the instrumented loop at the next phase or progress event
+    # after cancel() has been called, so long operations can be stopped from another thread
+
+    def __init__(self, callback=None, track_memory=False, progress_interval=1000):
+        super().__init__(callback, track_memory, progress_interval)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self, operation, **data):
+        if self.cancelled.is_set():
+            raise OperationCancelled(f"{operation} was cancelled.")
+        super().progress(operation, **data)
+
+    @contextmanager
+    def phase(self, operation, name):
+        if self.cancelled.is_set():
+            raise OperationCancelled(f"{operation} was cancelled.")
+        with super().phase(operation, name):
+            yield self